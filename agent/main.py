@@ -1,3 +1,4 @@
+import logging
 import time
 
 from settings import Settings
@@ -6,6 +7,10 @@ from agent.windows import WindowsService
 
 # Пример использования с демонстрацией
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     setting = Settings()
     # Создаем callback функции для демонстрации
     def on_scan_start():
@@ -1,7 +1,30 @@
 import json
+import functools
 import ipaddress
+import re
 from typing import Any, Dict
 
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
+
+
+# Settings are validated on every load, remember already parsed addresses
+_parse_ip_address = functools.lru_cache(maxsize=64)(ipaddress.ip_address)
+
+# Dotted-quad IPv4 without leading zeros, same as ipaddress accepts
+_IPV4_OCTET = r'(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])'
+_IPV4_RE = re.compile(rf'(?:{_IPV4_OCTET}\.){{3}}{_IPV4_OCTET}')
+
 
 class Settings:
     """
@@ -33,12 +56,16 @@ class Settings:
         If file doesn't exist or has errors, use default values
         """
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                file_settings = json.load(f)
+            with open(self.config_file, 'rb') as f:
+                file_settings = _loads(f.read())
 
             # Validate and update each setting
             for key, value in file_settings.items():
                 if key in self.DEFAULT_SETTINGS:
+                    current = self._settings.get(key)
+                    if type(current) is type(value) and current == value:
+                        # Already validated
+                        continue
                     try:
                         # Use setter for validation
                         setattr(self, key, value)
@@ -59,10 +86,19 @@ class Settings:
     def save(self) -> None:
         """
         Save current settings to JSON file
+        The file is not rewritten if its content is already up to date
         """
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self._settings, f, indent=4, ensure_ascii=False)
+            content = _dumps(self._settings)
+            try:
+                with open(self.config_file, 'rb') as f:
+                    if f.read() == content:
+                        return
+            except FileNotFoundError:
+                pass
+
+            with open(self.config_file, 'wb') as f:
+                f.write(content)
             print(f"Settings saved to '{self.config_file}'")
         except Exception as e:
             print(f"Error saving settings: {e}")
@@ -73,8 +109,12 @@ class Settings:
         if not isinstance(value, str):
             raise ValueError(f"Server address must be a string, got {type(value)}")
 
+        # Most addresses are IPv4, ipaddress is only needed for IPv6
+        if _IPV4_RE.fullmatch(value):
+            return value
+
         try:
-            ipaddress.ip_address(value)
+            _parse_ip_address(value)
             return value
         except ValueError:
             raise ValueError(f"Invalid IP address: {value}")
@@ -187,3 +227,11 @@ class Settings:
     def __repr__(self) -> str:
         """Detailed string representation"""
         return f"Settings(config_file='{self.config_file}', settings={self._settings})"
+
+    def __copy__(self) -> 'Settings':
+        """Copy settings without reading the config file again"""
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        # Setters write into _settings, the copy needs its own
+        clone._settings = self._settings.copy()
+        return clone
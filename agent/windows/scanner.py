@@ -1,137 +1,307 @@
 import winreg
-import subprocess
-import csv
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from system import SystemInfo
 
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
+
+# Get logger
+logger = logging.getLogger("WindowsScanner")
+
+# FILETIME value (100 ns intervals since 1601-01-01) of the Unix epoch
+FILETIME_UNIX_EPOCH = 116444736000000000
+
 
 class WindowsScanner:
     """
     Class for scanning installed software in Windows
     """
 
-    def __init__(self):
+    # Uninstall keys enumerated by the registry scan
+    REGISTRY_PATHS = (
+        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    )
+
+    # Bumped when the layout of the rows in cache_file changes
+    SCAN_CACHE_VERSION = 2
+
+    # Threads used to read Uninstall subkeys
+    REGISTRY_WORKERS = 8
+
+    # ExecQuery flags for a forward-only, semisynchronous WMI enumeration
+    WBEM_FLAG_RETURN_IMMEDIATELY = 0x10
+    WBEM_FLAG_FORWARD_ONLY = 0x20
+
+    # WMI classes tried in order: (class, name, version, vendor, install date)
+    # Win32Reg_AddRemovePrograms is installed with the SCCM client
+    WMI_SOURCES = (
+        ("Win32Reg_AddRemovePrograms", "DisplayName", "Version", "Publisher", "InstallDate"),
+        ("Win32_InstalledWin32Program", "Name", "Version", "Vendor", None),
+    )
+
+    # Enumerating Win32_Product runs an MSI consistency check on every product
+    LEGACY_WMI_SOURCE = ("Win32_Product", "Name", "Version", "Vendor", "InstallDate")
+
+    def __init__(self, use_wmic: bool = False, cache_file: str = None, legacy_wmic: bool = False):
         """
         Initialize scanner
+
+        Args:
+            use_wmic (bool): also query installed programs via WMI (registry-only by default)
+            cache_file (str): path to persist the scan cache, kept in memory only if None
+            legacy_wmic (bool): query the slow Win32_Product class instead of WMI_SOURCES
         """
+        self.use_wmic = use_wmic
+        self.legacy_wmic = legacy_wmic
+        self.cache_file = cache_file
+        # Guards cache_data and _names_lower, used from the service and caller threads
+        self._lock = threading.RLock()
+        # Lets concurrent scan() calls wait for the running scan instead of starting another
+        self._scan_in_progress = threading.Event()
+        self._scan_done = threading.Event()
+        # Outcome of the last finished scan, read by the callers that waited for it
+        self._scan_result = None
+        self._scan_error = None
         self.cache_data = None
+        # Lowercased names parallel to cache_data['software_list'] for searching
+        self._names_lower = []
+        self._scan_cache = None
+        # One shared string per distinct vendor across all rows
+        self._vendor_pool = {}
         self.system_info = SystemInfo()
 
+    def _intern_vendor(self, vendor):
+        """
+        Return the pooled copy of a vendor string
+
+        Args:
+            vendor (str): vendor name
+
+        Returns:
+            str: shared vendor string or None if empty
+        """
+        if not vendor:
+            return None
+        return self._vendor_pool.setdefault(vendor, vendor)
+
+    def _read_values(self, hkey, value_count):
+        """
+        Read all values of a registry key in a single EnumValue sweep
+
+        Args:
+            hkey: open registry key
+            value_count (int): number of values in the key
+
+        Returns:
+            dict: value name to value
+        """
+        values = {}
+        for i in range(value_count):
+            name, value, _ = winreg.EnumValue(hkey, i)
+            values[name] = value
+
+        return values
+
+    def _read_subkey(self, hive, path, subkey_name):
+        """
+        Read software information from a single Uninstall subkey
+
+        Args:
+            hive: registry hive handle
+            path (str): path of the Uninstall key
+            subkey_name (str): name of the subkey to read
+
+        Returns:
+            dict: software information or None if the entry has no DisplayName
+                or is hidden from Add/Remove Programs
+        """
+        try:
+            subkey = winreg.OpenKey(hive, f"{path}\\{subkey_name}")
+        except (FileNotFoundError, PermissionError, OSError):
+            return None
+
+        try:
+            _, value_count, mod_time = winreg.QueryInfoKey(subkey)
+            values = self._read_values(subkey, value_count)
+
+            if not values.get('DisplayName'):
+                return None
+
+            # Skip entries Add/Remove Programs hides: system components,
+            # updates attached to a parent product and non-removable entries
+            if values.get('SystemComponent', 0):
+                return None
+            if values.get('ParentKeyName'):
+                return None
+            if not values.get('UninstallString'):
+                return None
+
+            # Basic information
+            return {
+                'name': values['DisplayName'],
+                '_name_lower': values['DisplayName'].lower(),
+                'version': values.get('DisplayVersion'),
+                'vendor': self._intern_vendor(values.get('Publisher')),
+                # Installation date and registry key modification time
+                'install_date': self._parse_install_date(values.get('InstallDate')),
+                'update_date': self._format_filetime(mod_time),
+                'source': 'registry'
+            }
+        except (PermissionError, OSError):
+            return None
+        finally:
+            winreg.CloseKey(subkey)
+
     def _get_software_from_registry(self):
         """
         Collect installed software information from Windows registry
 
+        Subkey names are enumerated first, then the subkeys are read in a
+        thread pool: winreg releases the GIL around each registry call, so
+        the round-trips overlap.
+
         Returns:
             list: list of dictionaries with software information
         """
-        software_list = []
-        registry_paths = [
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
-        ]
+        hives, paths, subkey_names = [], [], []
 
-        for hive, path in registry_paths:
+        for hive, path in self.REGISTRY_PATHS:
             try:
                 key = winreg.OpenKey(hive, path)
+            except (FileNotFoundError, PermissionError):
+                continue
+
+            try:
                 for i in range(winreg.QueryInfoKey(key)[0]):
                     try:
                         subkey_name = winreg.EnumKey(key, i)
-                        subkey = winreg.OpenKey(key, subkey_name)
+                    except OSError:
+                        continue
+                    hives.append(hive)
+                    paths.append(path)
+                    subkey_names.append(subkey_name)
+            finally:
+                winreg.CloseKey(key)
 
-                        software = {}
-                        try:
-                            software['name'] = winreg.QueryValueEx(subkey, 'DisplayName')[0]
-                        except FileNotFoundError:
-                            winreg.CloseKey(subkey)
-                            continue
-
-                        # Basic information
-                        try:
-                            software['version'] = winreg.QueryValueEx(subkey, 'DisplayVersion')[0]
-                        except FileNotFoundError:
-                            software['version'] = None
-
-                        try:
-                            software['vendor'] = winreg.QueryValueEx(subkey, 'Publisher')[0]
-                        except FileNotFoundError:
-                            software['vendor'] = None
-
-                        # Installation and update dates
-                        try:
-                            install_date = winreg.QueryValueEx(subkey, 'InstallDate')[0]
-                            software['install_date'] = self._parse_install_date(install_date)
-                        except FileNotFoundError:
-                            software['install_date'] = None
-
-                        # For update date use registry key modification time
-                        try:
-                            mod_time = winreg.QueryInfoKey(subkey)[2]
-                            software['update_date'] = datetime.fromtimestamp(mod_time).strftime("%Y-%m-%d %H:%M:%S")
-                        except:
-                            software['update_date'] = None
-
-                        software['source'] = 'registry'
-                        software_list.append(software)
+        with ThreadPoolExecutor(max_workers=self.REGISTRY_WORKERS) as executor:
+            rows = executor.map(self._read_subkey, hives, paths, subkey_names)
+            return [software for software in rows if software is not None]
 
-                        winreg.CloseKey(subkey)
-                    except (FileNotFoundError, PermissionError, OSError):
-                        continue
+    def _get_software_from_wmi_com(self):
+        """
+        Collect installed software information via WMI COM (pywin32)
 
-                winreg.CloseKey(key)
-            except (FileNotFoundError, PermissionError):
-                continue
+        Only used when the scanner is created with use_wmic=True, the registry
+        enumeration covers the same programs without the WMI overhead.
+        Rows are yielded as the forward-only enumerator returns them, so they
+        are merged while WMI is still enumerating and never held in a list.
+
+        Yields:
+            dict: software information
+        """
+        try:
+            import pythoncom
+            import win32com.client
+        except ImportError:
+            logger.warning("pywin32 is not installed - skipping WMI data")
+            return
+
+        # COM is initialized per thread and scans run on the service thread
+        pythoncom.CoInitialize()
+        try:
+            try:
+                wmi = win32com.client.GetObject(r"winmgmts:\\.\root\cimv2")
+            except Exception as e:
+                logger.error(f"WMI connection error: {e}")
+                return
+
+            yield from self._query_wmi_sources(wmi)
+            # Release the COM object before uninitializing
+            wmi = None
+        finally:
+            pythoncom.CoUninitialize()
+
+    def _query_wmi_sources(self, wmi):
+        """
+        Enumerate installed programs from the first WMI class that returns rows
 
-        return software_list
+        Args:
+            wmi: connected WMI service object
+
+        Yields:
+            dict: software information
+        """
+        sources = (self.LEGACY_WMI_SOURCE,) if self.legacy_wmic else self.WMI_SOURCES
+        for wmi_class, name_property, version_property, vendor_property, date_property in sources:
+            properties = [name_property, version_property, vendor_property]
+            if date_property:
+                properties.append(date_property)
+
+            found = False
+            try:
+                rows = wmi.ExecQuery(
+                    f"SELECT {', '.join(properties)} FROM {wmi_class}",
+                    "WQL",
+                    self.WBEM_FLAG_FORWARD_ONLY | self.WBEM_FLAG_RETURN_IMMEDIATELY
+                )
+
+                for row in rows:
+                    found = True
+                    name = (getattr(row, name_property) or '').strip()
+                    if not name:
+                        continue
 
-    def _get_software_from_wmic(self):
+                    install_date = getattr(row, date_property) if date_property else None
+                    yield {
+                        'name': name,
+                        '_name_lower': name.lower(),
+                        'version': (getattr(row, version_property) or '').strip(),
+                        'vendor': self._intern_vendor((getattr(row, vendor_property) or '').strip()),
+                        'install_date': self._parse_wmic_date(install_date or ''),
+                        'update_date': None,
+                        'source': 'wmic'
+                    }
+
+            except Exception as e:
+                logger.warning(f"WMI query on {wmi_class} failed: {e}")
+
+            if found:
+                return
+
+    @staticmethod
+    def _format_filetime(filetime):
         """
-        Collect installed software information via WMIC
+        Format a FILETIME value as local time
+
+        Args:
+            filetime (int): 100 ns intervals since 1601-01-01
 
         Returns:
-            list: list of dictionaries with software information
+            str: formatted date and time or None
         """
-        software_list = []
         try:
-            # Используем другую кодировку для WMIC
-            result = subprocess.run(
-                ['wmic', 'product', 'get', 'Name,Version,Vendor,InstallDate', '/format:csv'],
-                capture_output=True,
-                text=True,
-                encoding='cp866',  # Изменяем кодировку для русской Windows
-                timeout=30
-            )
-
-            if result.returncode != 0:
-                print(f"WMIC returned error code: {result.returncode}")
-                return software_list
-
-            lines = result.stdout.strip().split('\n')
-
-            if len(lines) > 1:
-                reader = csv.DictReader(lines)
-                for row in reader:
-                    if row.get('Name') and row['Name'].strip():
-                        software = {
-                            'name': row.get('Name', '').strip(),
-                            'version': row.get('Version', '').strip(),
-                            'vendor': row.get('Vendor', '').strip(),
-                            'install_date': self._parse_wmic_date(row.get('InstallDate', '')),
-                            'update_date': None,
-                            'source': 'wmic'
-                        }
-                        software_list.append(software)
-
-        except subprocess.TimeoutExpired:
-            print("WMIC timeout - skipping WMIC data")
-        except subprocess.CalledProcessError as e:
-            print(f"WMIC process error: {e}")
-        except Exception as e:
-            print(f"WMIC general error: {e}")
-
-        return software_list
-
-    def _parse_install_date(self, date_str):
+            timestamp = (filetime - FILETIME_UNIX_EPOCH) / 10 ** 7
+            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError, OverflowError, OSError):
+            return None
+
+    @staticmethod
+    def _parse_install_date(date_str):
         """
         Parse installation date from various formats
 
@@ -179,57 +349,197 @@ class WindowsScanner:
 
         Args:
             registry_list (list): list from registry
-            wmic_list (list): list from WMIC
+            wmic_list (iterable): rows from WMI, consumed as they arrive
 
         Returns:
             list: merged list without duplicates
         """
-        merged_list = []
-        seen_names = set()
+        # Keyed by lowercased name, dicts keep insertion order
+        merged = {}
 
         # First add from registry (more programs)
         for software in registry_list:
-            name_lower = software['name'].lower()
-            if name_lower not in seen_names:
-                merged_list.append(software)
-                seen_names.add(name_lower)
+            merged.setdefault(software['_name_lower'], software)
 
         # Then add from WMIC what's not in registry
         for software in wmic_list:
-            name_lower = software['name'].lower()
-            if name_lower not in seen_names:
-                merged_list.append(software)
-                seen_names.add(name_lower)
+            merged.setdefault(software['_name_lower'], software)
+
+        return list(merged.values())
+
+    def _registry_fingerprint(self):
+        """
+        Compute a cheap fingerprint of the Uninstall keys
+
+        Installing or removing a program adds or deletes a subkey, which
+        changes the parent key; an in-place upgrade only rewrites values
+        inside its own subkey, so the last write time of every subkey is
+        folded in as well. Only key metadata is read, no values.
+
+        Returns:
+            int: 64-bit fingerprint of both Uninstall keys
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        for hive, path in self.REGISTRY_PATHS:
+            try:
+                key = winreg.OpenKey(hive, path)
+            except (FileNotFoundError, PermissionError):
+                continue
+
+            try:
+                subkey_count, _, last_write = winreg.QueryInfoKey(key)
+                digest.update(f"{path}|{subkey_count}|{last_write}\n".encode('utf-8'))
+
+                for i in range(subkey_count):
+                    try:
+                        subkey_name = winreg.EnumKey(key, i)
+                        subkey = winreg.OpenKey(key, subkey_name)
+                    except OSError:
+                        continue
+                    try:
+                        subkey_write = winreg.QueryInfoKey(subkey)[2]
+                    except OSError:
+                        subkey_write = None
+                    finally:
+                        winreg.CloseKey(subkey)
+                    digest.update(f"{subkey_name}|{subkey_write}\n".encode('utf-8'))
+            finally:
+                winreg.CloseKey(key)
+
+        return int.from_bytes(digest.digest(), 'big')
+
+    def _load_scan_cache(self):
+        """
+        Get the scan cache, reading it from cache_file on first use
+
+        Returns:
+            dict: cached fingerprint, timestamp and software list or None
+        """
+        if self._scan_cache is None and self.cache_file:
+            try:
+                with open(self.cache_file, 'rb') as f:
+                    scan_cache = _loads(f.read())
+                if scan_cache.get('version') == self.SCAN_CACHE_VERSION:
+                    for row in scan_cache['software_list']:
+                        row['vendor'] = self._intern_vendor(row.get('vendor'))
+                    self._scan_cache = scan_cache
+                else:
+                    logger.debug("Scan cache has an old format, ignoring it")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error loading scan cache: {e}")
+
+        return self._scan_cache
+
+    def _store_scan_cache(self, fingerprint, software_list, timestamp):
+        """
+        Save the software list for the given registry fingerprint
 
-        return merged_list
+        Args:
+            fingerprint (int): registry fingerprint the list was collected for
+            software_list (list): collected software list
+            timestamp (str): ISO timestamp of the scan
+        """
+        self._scan_cache = {
+            'version': self.SCAN_CACHE_VERSION,
+            'fingerprint': fingerprint,
+            'timestamp': timestamp,
+            'software_list': software_list
+        }
+
+        if self.cache_file:
+            try:
+                with open(self.cache_file, 'wb') as f:
+                    f.write(_dumps(self._scan_cache))
+            except Exception as e:
+                logger.error(f"Error saving scan cache: {e}")
 
     def scan(self):
         """
         Public method for scanning installed software
 
+        The software list is reused from the scan cache while the registry
+        fingerprint stays the same. A call made while another thread is
+        scanning waits for that scan and returns its result, or re-raises
+        its error.
+
         Returns:
             dict: JSON object with scan results
         """
-        # Collect data from different sources
-        registry_software = self._get_software_from_registry()
-        wmic_software = self._get_software_from_wmic()
+        with self._lock:
+            scan_running = self._scan_in_progress.is_set()
+            if not scan_running:
+                self._scan_in_progress.set()
+                self._scan_done.clear()
+
+        if scan_running:
+            logger.debug("Scan already in progress, waiting for it")
+            self._scan_done.wait()
+            with self._lock:
+                result, error = self._scan_result, self._scan_error
+            if error is not None:
+                raise error
+            return result
+
+        result, error = None, None
+        try:
+            result = self._scan()
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                # Handed to the callers that waited for this scan
+                self._scan_result, self._scan_error = result, error
+                self._scan_in_progress.clear()
+                self._scan_done.set()
+
+    def _scan(self):
+        """
+        Collect the software list and update the memory cache
 
-        # Merge results
-        all_software = self._merge_software_lists(registry_software, wmic_software)
+        Returns:
+            dict: JSON object with scan results
+        """
+        fingerprint = self._registry_fingerprint()
+        scan_cache = self._load_scan_cache()
+
+        if scan_cache is not None and scan_cache.get('fingerprint') == fingerprint:
+            logger.debug("Registry unchanged since last scan, using cached software list")
+            all_software = scan_cache['software_list']
+            names_lower = [software['name'].lower() for software in all_software]
+            scan_timestamp = datetime.now().isoformat()
+        else:
+            # Collect data from different sources
+            registry_software = self._get_software_from_registry()
+            wmic_software = self._get_software_from_wmi_com() if self.use_wmic else ()
 
-        # Sort by name
-        all_software.sort(key=lambda x: x['name'].lower())
+            # Merge results
+            all_software = self._merge_software_lists(registry_software, wmic_software)
+
+            # Sort by name
+            all_software.sort(key=lambda x: x['_name_lower'])
+
+            # Move the lowercased names into the search index so they don't end up in the result
+            names_lower = [software.pop('_name_lower') for software in all_software]
+
+            scan_timestamp = datetime.now().isoformat()
+            self._store_scan_cache(fingerprint, all_software, scan_timestamp)
 
         # Create result with proper structure
         result = {
             'system_info': self.system_info.collect_all_info(),
-            'scan_timestamp': datetime.now().isoformat(),
+            'scan_timestamp': scan_timestamp,
             'software_count': len(all_software),
             'software_list': all_software
         }
 
         # Save to memory cache
-        self.cache_data = result
+        with self._lock:
+            self._names_lower = names_lower
+            self.cache_data = result
         return result
 
     def get_data(self):
@@ -240,18 +550,22 @@ class WindowsScanner:
             dict: JSON object with installed software data
         """
         # Check memory cache first
-        if self.cache_data is not None:
-            print("Data loaded from memory cache")
-            return self.cache_data
-        else:
-            print("Cache is empty, starting scan...")
-            return self.scan()
+        with self._lock:
+            if self.cache_data is not None:
+                logger.debug("Data loaded from memory cache")
+                return self.cache_data
+
+        # Not holding the lock here, concurrent callers share one scan
+        logger.info("Cache is empty, starting scan...")
+        return self.scan()
 
     def clear_cache(self):
         """
         Clear memory cache
         """
-        self.cache_data = None
+        with self._lock:
+            self.cache_data = None
+            self._names_lower = []
 
     def get_software_names(self):
         """
@@ -260,10 +574,8 @@ class WindowsScanner:
         Returns:
             list: list of software names
         """
-        if self.cache_data is None:
-            self.get_data()
-
-        return [software['name'] for software in self.cache_data['software_list']]
+        data = self.get_data()
+        return [software['name'] for software in data['software_list']]
 
     def find_software_by_name(self, name_pattern):
         """
@@ -275,11 +587,17 @@ class WindowsScanner:
         Returns:
             list: list of matching software
         """
-        if self.cache_data is None:
-            self.get_data()
+        # Scan outside the lock so concurrent callers can join a running scan
+        data = self.get_data()
+        software_list = data['software_list']
+        with self._lock:
+            # The index belongs to cache_data, which another scan may have replaced
+            names_lower = self._names_lower if self.cache_data is data else None
+        if names_lower is None:
+            names_lower = [software['name'].lower() for software in software_list]
 
         pattern_lower = name_pattern.lower()
         return [
-            software for software in self.cache_data['software_list']
-            if pattern_lower in software['name'].lower()
+            software_list[i] for i, name_lower in enumerate(names_lower)
+            if pattern_lower in name_lower
         ]
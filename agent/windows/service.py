@@ -1,18 +1,99 @@
+import os
+import ctypes
+import gzip
+import hashlib
+import logging
+import queue
 import threading
 import time
+import winreg
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from ..settings import Settings
 from scanner import WindowsScanner
 
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+try:
+    import zstandard
+
+    # Only used from the sender thread
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+
+    def _compress(body):
+        return _zstd_compressor.compress(body), 'zstd'
+except ImportError:
+    def _compress(body):
+        return gzip.compress(body, compresslevel=6), 'gzip'
+
+
+def _payload_digest(data):
+    """
+    Hash scan data, ignoring the scan timestamp which changes every scan
+
+    Args:
+        data (dict): scan result
+
+    Returns:
+        str: hex digest
+    """
+    return hashlib.blake2b(
+        _dumps({key: value for key, value in data.items() if key != 'scan_timestamp'}),
+        digest_size=16
+    ).hexdigest()
+
+# Get logger
+logger = logging.getLogger("WindowsService")
+
+# RegNotifyChangeKeyValue filter: subkey added/removed or value changed
+REG_NOTIFY_CHANGE_NAME = 0x00000001
+REG_NOTIFY_CHANGE_LAST_SET = 0x00000004
+WAIT_OBJECT_0 = 0x00000000
+WAIT_FAILED = 0xFFFFFFFF
+ERROR_SUCCESS = 0
+
+
 class WindowsService:
     """
     Background service for managing Windows software scanning
     """
 
+    SCAN_CACHE_FILE = "scan_cache.json"
+
+    # How often the registry watcher checks for stop(), in milliseconds
+    REGISTRY_WATCH_TIMEOUT_MS = 1000
+
+    # An installer writes many values, rescan once the keys stay quiet this long, in seconds
+    REGISTRY_QUIET_PERIOD = 5.0
+
+    # Pending sends; a newer scan is dropped while the sender is behind
+    SEND_QUEUE_SIZE = 2
+
+    # How long get_software_data returns its last result without asking the scanner, in seconds
+    DATA_CACHE_TTL = 5.0
+
+    # Shortest scan/send period, Settings accepts timeouts of 0, in seconds
+    MIN_TASK_INTERVAL = 1
+
+    # Unchanged data is still sent after this many skipped sends, the server
+    # keeps inventories in memory only and loses them on restart
+    MAX_SKIPPED_SENDS = 5
+
+    # Service loop retry delay after an error, in seconds
+    ERROR_BACKOFF_MIN = 1
+    ERROR_BACKOFF_MAX = 300
+
     def __init__(self, settings: Settings):  # default 1 hour
         """
         Initialize Windows service
@@ -20,12 +101,46 @@ class WindowsService:
         Args:
             settings: Settings for Service.
         """
-        self.scanner = WindowsScanner()
+        # Keep the scan cache next to the config file
+        cache_file = os.path.join(os.path.dirname(os.path.abspath(settings.config_file)), self.SCAN_CACHE_FILE)
+        self.scanner = WindowsScanner(cache_file=cache_file)
         self.settings = settings
+        self._server_url = f"http://{settings.server_address}:{settings.server_port}/api/v1/agent/data"
+        # Digest of the last payload the server accepted, without scan_timestamp
+        self._last_payload_hash = None
+        # Sends skipped in a row since the server last accepted data
+        self._skipped_sends = 0
+        # Keep-alive connection to the server reused across sends
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=4,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=frozenset({"POST"})
+            )
+        ))
         self.is_running = False
         self.service_thread = None
+        self.registry_watch_thread = None
+        self.sender_thread = None
+        self._send_queue = queue.Queue(maxsize=self.SEND_QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        # Set by the registry watcher when an Uninstall key changes
+        self._rescan_event = threading.Event()
         self.last_scan_time = None
         self.scan_count = 0
+        # Result of the most recent scan, reused by sends
+        self._last_scan_data = None
+        self._last_scan_lock = threading.Lock()
+        # Last get_software_data result, its monotonic time, source object and digest
+        self._data_cache = None
+        self._data_cache_ts = 0.0
+        self._data_cache_source = None
+        self._data_cache_hash = None
+        self._data_cache_lock = threading.Lock()
         self.last_send_time = None
         self.send_count = 0
 
@@ -41,20 +156,36 @@ class WindowsService:
         Start the background service
         """
         if self.is_running:
-            print("Service is already running")
+            logger.warning("Service is already running")
             return False
 
-        print("Starting Windows Service...")
+        logger.info("Starting Windows Service...")
         self.is_running = True
+        self._stop_event.clear()
+        self._rescan_event.clear()
+        # Drop the stop sentinel and unsent data left over from a previous run
+        while True:
+            try:
+                self._send_queue.get_nowait()
+            except queue.Empty:
+                break
 
         # Запускаем фоновый поток
         self.service_thread = threading.Thread(target=self._service_loop, daemon=True)
         self.service_thread.start()
 
-        # Выполняем первоначальное сканирование
-        self._trigger_scan()
+        # Следим за изменениями в ключах Uninstall
+        self.registry_watch_thread = threading.Thread(target=self._registry_watch_loop, daemon=True)
+        self.registry_watch_thread.start()
+
+        # Отправка на сервер идет в отдельном потоке
+        self.sender_thread = threading.Thread(target=self._sender_loop, daemon=True)
+        self.sender_thread.start()
 
-        print("Windows Service started successfully")
+        # Первоначальное сканирование выполняет сам цикл сервиса: таймеры
+        # еще ни разу не срабатывали, поэтому скан и отправка идут сразу
+
+        logger.info("Windows Service started successfully")
         return True
 
     def stop(self):
@@ -62,18 +193,44 @@ class WindowsService:
         Stop the background service
         """
         if not self.is_running:
-            print("Service is not running")
+            logger.warning("Service is not running")
             return False
 
-        print("Stopping Windows Service...")
+        logger.info("Stopping Windows Service...")
         self.is_running = False
+        self._stop_event.set()
+        # Wake the service loop so it notices the stop immediately
+        self._rescan_event.set()
+        # Wake the sender so it sees the stop without waiting for data
+        try:
+            self._send_queue.put_nowait(None)
+        except queue.Full:
+            pass
 
         if self.service_thread and self.service_thread.is_alive():
             self.service_thread.join(timeout=5)
 
-        print("Windows Service stopped")
+        if self.registry_watch_thread and self.registry_watch_thread.is_alive():
+            self.registry_watch_thread.join(timeout=5)
+
+        if self.sender_thread and self.sender_thread.is_alive():
+            self.sender_thread.join(timeout=5)
+
+        # A send can outlast the join, the sender then closes the session when it finishes
+        if self.sender_thread and self.sender_thread.is_alive():
+            logger.info("Send still in progress, connections are closed when it completes")
+        else:
+            self.close()
+
+        logger.info("Windows Service stopped")
         return True
 
+    def close(self):
+        """
+        Close pooled connections to the server
+        """
+        self._session.close()
+
     def _send_data_to_server(self, data: Dict[str, Any]) -> bool:
         """
         Send scanned data to the server
@@ -84,96 +241,277 @@ class WindowsService:
         Returns:
             bool: True if successful, False otherwise
         """
-        # Формируем полный URL сервера
-        server_url = f"http://{self.settings.server_address}:{self.settings.server_port}/api/v1/agent/data"
-
-        print(f"[Service] Sending data to server: {server_url}")
-        print(f"[Service] Data size: {len(str(data))} bytes, software items: {data.get('software_count', 0)}")
+        logger.debug(f"Sending data to server: {self._server_url}")
+        payload_hash = _payload_digest(data)
+        if payload_hash == self._last_payload_hash and self._skipped_sends < self.MAX_SKIPPED_SENDS:
+            self._skipped_sends += 1
+            logger.info("Data unchanged since last send, skipping")
+            return True
 
         # Отправляем POST запрос
-        response = requests.post(
-            server_url,
-            json=data,
-            headers={'Content-Type': 'application/json'},
+        raw_body = _dumps(data)
+        body, content_encoding = _compress(raw_body)
+        logger.debug(f"Data size: {len(raw_body)} bytes ({len(body)} {content_encoding}), "
+                     f"software items: {data.get('software_count', 0)}")
+
+        response = self._session.post(
+            self._server_url,
+            data=body,
+            headers={
+                'Content-Type': 'application/json',
+                'Content-Encoding': content_encoding
+            },
             timeout=30  # 30 секунд таймаут
         )
 
         # Проверяем ответ
         if response.status_code == 200:
             result = response.json()
-            print(f"[Service] Data successfully sent to server. Response: {result.get('message', 'Unknown')}")
+            self._last_payload_hash = payload_hash
+            self._skipped_sends = 0
+            logger.info(f"Data successfully sent to server. Response: {result.get('message', 'Unknown')}")
             return True
         else:
-            print(f"[Service] Server returned error: {response.status_code} - {response.text}")
+            logger.error(f"Server returned error: {response.status_code} - {response.text}")
             return False
 
     def _service_loop(self):
         """
         Main service loop running in background thread
         """
-        print("Service loop started")
+        logger.debug("Service loop started")
+        backoff = self.ERROR_BACKOFF_MIN
 
         while self.is_running:
             try:
-                # Здесь будет логика по расписанию
-                # Пока просто ждем и проверяем флаг
-                time.sleep(1)
+                now = datetime.now()
+                next_scan_at = self._next_run_at(self.last_scan_time, self.settings.timeout_scan, now)
+                next_send_at = self._next_run_at(self.last_send_time, self.settings.timeout_send, now)
+                sleep_for = max(0.0, (min(next_scan_at, next_send_at) - now).total_seconds())
+
+                # Спим до ближайшего таймера; stop() и изменения в реестре будят раньше
+                if self._rescan_event.wait(timeout=sleep_for):
+                    self._rescan_event.clear()
+                    if self._stop_event.is_set():
+                        break
+                    logger.info("Installed software changed, rescanning...")
+                    self._trigger_scan()
+                    continue
+
+                now = datetime.now()
 
                 # Заглушка для демонстрации - сканируем каждые timeout_scan секунд
-                if (self.last_scan_time is None or
-                        (datetime.now() - self.last_scan_time).total_seconds() >= self.settings.timeout_scan):
-                    self._trigger_scan()
+                scan_ok = True
+                if now >= next_scan_at:
+                    scan_ok = self._trigger_scan()
 
-                # Заглушка для демонстрации - сканируем каждые scan_interval секунд
-                if (self.last_send_time is None or
-                        (datetime.now() - self.last_send_time).total_seconds() >= self.settings.timeout_send):
-                    self._trigger_scan()
+                # Отправляем данные каждые timeout_send секунд
+                if now >= next_send_at:
+                    self._trigger_send()
+
+                # A failed scan leaves the timer due, back off instead of spinning
+                if not scan_ok:
+                    logger.warning(f"Scheduled scan failed, retrying in {backoff}s")
+                    self._stop_event.wait(backoff)
+                    backoff = min(backoff * 2, self.ERROR_BACKOFF_MAX)
+                    continue
+
+                backoff = self.ERROR_BACKOFF_MIN
+
+            except Exception as e:
+                logger.error(f"Error in service loop: {e}, retrying in {backoff}s")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.ERROR_BACKOFF_MAX)
+
+    @staticmethod
+    def _next_run_at(last_time, interval, now):
+        """
+        Get the time a periodic task is due next
+
+        Args:
+            last_time (datetime): last run time or None if it never ran
+            interval (int): task period in seconds, at least MIN_TASK_INTERVAL is used
+            now (datetime): current time
+
+        Returns:
+            datetime: time of the next run
+        """
+        if last_time is None:
+            return now
+        return last_time + timedelta(seconds=max(interval, WindowsService.MIN_TASK_INTERVAL))
+
+    def _sender_loop(self):
+        """
+        Send queued scan results to the server
+
+        Runs in its own thread so network I/O never delays the next scan.
+        Closes the server connections on exit, see stop().
+        """
+        logger.debug("Sender loop started")
+
+        while not self._stop_event.is_set():
+            data = self._send_queue.get()
+            if data is None:
+                # Stop sentinel; re-check the stop event in case it is stale
+                continue
+
+            try:
+                if self.on_send_start:
+                    self.on_send_start()
+
+                logger.debug(f"Starting send #{self.send_count + 1}...")
+                if self._send_data_to_server(data):
+                    self.send_count += 1
+                    logger.info(f"Send #{self.send_count} completed.")
+
+                if self.on_send_complete:
+                    self.on_send_complete()
 
             except Exception as e:
-                print(f"Error in service loop: {e}")
-                time.sleep(10)  # Wait before retrying
+                logger.error(f"Send error: {e}")
+
+        self.close()
+
+    def _registry_watch_loop(self):
+        """
+        Wait for changes in the Uninstall keys and request a rescan
+
+        Runs in its own thread; each key gets an asynchronous
+        RegNotifyChangeKeyValue registration with its own Win32 event.
+        Notifications are coalesced: the rescan is requested once no change
+        arrived for REGISTRY_QUIET_PERIOD seconds.
+        """
+        advapi32 = ctypes.WinDLL('advapi32')
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.CreateEventW.restype = ctypes.c_void_p
+        kernel32.CreateEventW.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_wchar_p]
+        kernel32.WaitForMultipleObjects.restype = ctypes.c_ulong
+        kernel32.WaitForMultipleObjects.argtypes = [ctypes.c_ulong, ctypes.POINTER(ctypes.c_void_p), ctypes.c_int, ctypes.c_ulong]
+        kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+        advapi32.RegNotifyChangeKeyValue.restype = ctypes.c_long
+        advapi32.RegNotifyChangeKeyValue.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_ulong, ctypes.c_void_p, ctypes.c_int]
+
+        notify_filter = REG_NOTIFY_CHANGE_NAME | REG_NOTIFY_CHANGE_LAST_SET
+        keys, events = [], []
+
+        def register(key, event):
+            # Returns the Win32 error code, notifications are one-shot
+            return advapi32.RegNotifyChangeKeyValue(key.handle, True, notify_filter, event, True)
+
+        try:
+            for hive, path in WindowsScanner.REGISTRY_PATHS:
+                try:
+                    key = winreg.OpenKey(hive, path, 0, winreg.KEY_NOTIFY)
+                except (FileNotFoundError, PermissionError):
+                    continue
+
+                event = kernel32.CreateEventW(None, False, False, None)
+                if not event:
+                    logger.error(f"CreateEventW failed for {path}: error {ctypes.get_last_error()}")
+                    winreg.CloseKey(key)
+                    continue
+
+                status = register(key, event)
+                if status != ERROR_SUCCESS:
+                    logger.error(f"RegNotifyChangeKeyValue failed for {path}: error {status}")
+                    kernel32.CloseHandle(event)
+                    winreg.CloseKey(key)
+                    continue
+
+                keys.append(key)
+                events.append(event)
+
+            if not keys:
+                logger.warning("No Uninstall keys to watch")
+                return
+
+            handles = (ctypes.c_void_p * len(events))(*events)
+            # Monotonic time of the last change not yet turned into a rescan
+            last_change = None
+            while not self._stop_event.is_set():
+                timeout_ms = self.REGISTRY_WATCH_TIMEOUT_MS
+                if last_change is not None:
+                    quiet_left = last_change + self.REGISTRY_QUIET_PERIOD - time.monotonic()
+                    if quiet_left <= 0:
+                        last_change = None
+                        self._rescan_event.set()
+                        continue
+                    timeout_ms = min(timeout_ms, int(quiet_left * 1000) + 1)
+
+                result = kernel32.WaitForMultipleObjects(len(events), handles, False, timeout_ms)
+                if result == WAIT_FAILED:
+                    logger.error(f"WaitForMultipleObjects failed: error {ctypes.get_last_error()}, "
+                                 f"registry watcher stopped")
+                    return
+
+                index = result - WAIT_OBJECT_0
+                if 0 <= index < len(events):
+                    status = register(keys[index], events[index])
+                    if status != ERROR_SUCCESS:
+                        logger.error(f"RegNotifyChangeKeyValue failed: error {status}, registry watcher stopped")
+                        self._rescan_event.set()
+                        return
+                    last_change = time.monotonic()
+
+        except Exception as e:
+            logger.error(f"Registry watcher error: {e}")
+        finally:
+            for key in keys:
+                winreg.CloseKey(key)
+            for event in events:
+                kernel32.CloseHandle(event)
 
     def _trigger_scan(self):
         """
         Trigger a new scan
+
+        Returns:
+            bool: True if the scan completed, False otherwise
         """
         try:
             if self.on_scan_start:
                 self.on_scan_start()
 
-            print(f"[Service] Starting scan #{self.scan_count + 1}...")
+            logger.debug(f"Starting scan #{self.scan_count + 1}...")
             data = self.scanner.scan()
+            with self._last_scan_lock:
+                self._last_scan_data = data
             self.last_scan_time = datetime.now()
             self.scan_count += 1
 
-            print(f"[Service] Scan #{self.scan_count} completed. Found {data['software_count']} software")
+            logger.info(f"Scan #{self.scan_count} completed. Found {data['software_count']} software")
 
             if self.on_scan_complete:
                 self.on_scan_complete(data)
 
+            return True
+
         except Exception as e:
-            print(f"[Service] Scan error: {e}")
+            logger.error(f"Scan error: {e}")
+            return False
 
     def _trigger_send(self):
         """
-        Trigger a new send
+        Queue current scan results for the sender thread
+
+        Sends the result of the last scan. Until a scan has completed the
+        send stays due and goes out on the first tick after that scan.
         """
         try:
-            if self.on_send_start:
-                self.on_send_start()
+            with self._last_scan_lock:
+                data = self._last_scan_data
+            if data is None:
+                logger.debug("No scan result to send yet")
+                return
 
-            print(f"[Service] Starting send #{self.send_count + 1}...")
-            data = self.scanner.scan()
             self.last_send_time = datetime.now()
-            self.send_count += 1
-            self._send_data_to_server(data)
-            print(f"[Service] Send #{self.send_count} completed.")
-
-            if self.on_send_complete:
-                self.on_send_complete()
+            try:
+                self._send_queue.put_nowait(data)
+            except queue.Full:
+                logger.warning("Sender is busy, skipping this send")
 
         except Exception as e:
-            print(f"[Service] Scan error: {e}")
+            logger.error(f"Send error: {e}")
 
     def get_software_data(self):
         """
@@ -186,19 +524,41 @@ class WindowsService:
             if self.on_data_request:
                 self.on_data_request()
 
-            print("[Service] Getting software data...")
+            now = time.monotonic()
+            with self._data_cache_lock:
+                if self._data_cache is not None and now - self._data_cache_ts < self.DATA_CACHE_TTL:
+                    return self._data_cache
+
+            logger.debug("Getting software data...")
             data = self.scanner.get_data()
-            return data
+
+            with self._data_cache_lock:
+                known_source = data is self._data_cache_source
+            # Hash outside the lock, it serializes the whole inventory
+            digest = None if known_source else _payload_digest(data)
+
+            with self._data_cache_lock:
+                # Same scan result or same content: keep handing out the same object
+                if digest is not None and data is not self._data_cache_source:
+                    if self._data_cache is None or digest != self._data_cache_hash:
+                        self._data_cache = data
+                        self._data_cache_hash = digest
+                    else:
+                        # The digest leaves out scan_timestamp, keep it current
+                        self._data_cache['scan_timestamp'] = data.get('scan_timestamp')
+                    self._data_cache_source = data
+                self._data_cache_ts = now
+                return self._data_cache
 
         except Exception as e:
-            print(f"[Service] Error getting data: {e}")
+            logger.error(f"Error getting data: {e}")
             return None
 
     def force_scan(self):
         """
         Force immediate scan regardless of schedule
         """
-        print("[Service] Forcing immediate scan...")
+        logger.info("Forcing immediate scan...")
         self._trigger_scan()
 
     def get_service_status(self):
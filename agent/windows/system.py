@@ -1,11 +1,19 @@
 # system_info.py
+import asyncio
 import platform
 import socket
 import uuid
 import json
 import subprocess
+import locale
 import re
-from typing import Dict, Any, Optional
+import time
+import psutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+# Key=Value lines of `wmic ... /format:list` output
+_WMIC_KV_RE = re.compile(r'^(\w+)=(.*?)\r?$', re.MULTILINE)
 
 
 class SystemInfo:
@@ -13,14 +21,22 @@ class SystemInfo:
     Class for collecting system information
     """
 
+    # How long the detected IP address is reused, in seconds
+    IP_ADDRESS_TTL = 60
+
+    # One thread per collector run by collect_all_info
+    COLLECTOR_WORKERS = 6
+
+    # Longest a console command may run before it is treated as failed, in seconds
+    COMMAND_TIMEOUT = 15
+
     def __init__(self):
-        self._cached_info: Optional[Dict[str, Any]] = {
-            "system": self._get_system_info(),
-            "hardware": self._get_hardware_info(),
-            "network": self._get_network_info(),
-            "bios": self._get_bios_info(),
-            "collection_timestamp": self._get_timestamp()
-        }
+        self._unique_id: Optional[str] = None
+        self._mac_address: Optional[str] = None
+        # (ip address, monotonic expiry time)
+        self._ip_address: Optional[Tuple[str, float]] = None
+        # Collected on first collect_all_info() call
+        self._cached_info: Optional[Dict[str, Any]] = None
 
     def collect_all_info(self) -> Dict[str, Any]:
         """
@@ -32,14 +48,81 @@ class SystemInfo:
         if self._cached_info is not None:
             return self._cached_info
 
-        self._cached_info = {
-            "system": self._get_system_info(),
-            "hardware": self._get_hardware_info(),
-            "network": self._get_network_info(),
-            "bios": self._get_bios_info(),
+        self._cached_info = self._collect_all_info()
+        return self._cached_info
+
+    async def collect_all_info_async(self) -> Dict[str, Any]:
+        """
+        Collect all system information without blocking the event loop
+
+        Returns:
+            dict: Complete system information
+        """
+        if self._cached_info is not None:
+            return self._cached_info
+
+        results = await asyncio.gather(*(asyncio.to_thread(collector) for collector in self._collectors()))
+        self._cached_info = self._assemble_info(*results)
+        return self._cached_info
+
+    def _collect_all_info(self) -> Dict[str, Any]:
+        """
+        Run all collectors concurrently
+
+        The collectors block on registry reads, system calls and the
+        wmic process, so running them in parallel makes the total time
+        that of the slowest one.
+
+        Returns:
+            dict: Complete system information
+        """
+        with ThreadPoolExecutor(max_workers=self.COLLECTOR_WORKERS) as executor:
+            futures = [executor.submit(collector) for collector in self._collectors()]
+            return self._assemble_info(*(future.result() for future in futures))
+
+    def _collectors(self):
+        """Get the collectors in the order _assemble_info takes their results"""
+        return (
+            self._get_system_info,
+            self._get_cpu_info,
+            self._get_memory_info,
+            self._get_disk_info,
+            self._get_network_info,
+            self._get_bios_info
+        )
+
+    def _assemble_info(self, system, cpu, memory, disks, network, bios) -> Dict[str, Any]:
+        """Build the system information dict from collector results"""
+        return {
+            "system": system,
+            "hardware": {
+                "cpu": cpu,
+                "memory": memory,
+                "disks": disks
+            },
+            "network": network,
+            "bios": bios,
             "collection_timestamp": self._get_timestamp()
         }
-        return self._cached_info
+
+    def _run_command(self, args, encoding: Optional[str] = None) -> Optional[str]:
+        """
+        Run a console command and decode its output in one pass
+
+        Args:
+            args: Command and arguments
+            encoding: Output encoding, defaults to the console code page
+
+        Returns:
+            str: Decoded stdout, or None if the command failed or timed out
+        """
+        try:
+            result = subprocess.run(args, capture_output=True, timeout=self.COMMAND_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout.decode(encoding or locale.getpreferredencoding(False), errors='replace')
 
     def _get_system_info(self) -> Dict[str, str]:
         """Get operating system information"""
@@ -56,24 +139,27 @@ class SystemInfo:
         except Exception as e:
             return {"error": f"Failed to get system info: {str(e)}"}
 
-    def _get_hardware_info(self) -> Dict[str, Any]:
-        """Get hardware information"""
-        try:
-            hardware_info = {}
-
-            # CPU information
-            hardware_info["cpu"] = self._get_cpu_info()
-
-            # Memory information
-            hardware_info["memory"] = self._get_memory_info()
+    def _read_registry_values(self, path: str, names) -> Dict[str, Any]:
+        """
+        Read values from a key under HKEY_LOCAL_MACHINE
 
-            # Disk information
-            hardware_info["disks"] = self._get_disk_info()
+        Args:
+            path: Registry key path
+            names: Value names to read
 
-            return hardware_info
+        Returns:
+            dict: Value name to value for the values that exist
+        """
+        import winreg
 
-        except Exception as e:
-            return {"error": f"Failed to get hardware info: {str(e)}"}
+        values = {}
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, path) as key:
+            for name in names:
+                try:
+                    values[name] = winreg.QueryValueEx(key, name)[0]
+                except FileNotFoundError:
+                    pass
+        return values
 
     def _get_cpu_info(self) -> Dict[str, str]:
         """Get CPU information"""
@@ -87,21 +173,15 @@ class SystemInfo:
             # Try to get more detailed CPU info on Windows
             if platform.system() == "Windows":
                 try:
-                    result = subprocess.run(
-                        ['wmic', 'cpu', 'get', 'Name,NumberOfCores,NumberOfLogicalProcessors', '/format:list'],
-                        capture_output=True, text=True, encoding='utf-8'
+                    values = self._read_registry_values(
+                        r"HARDWARE\DESCRIPTION\System\CentralProcessor\0", ["ProcessorNameString"]
                     )
-                    if result.returncode == 0:
-                        lines = result.stdout.split('\n')
-                        for line in lines:
-                            if 'Name=' in line:
-                                cpu_info["name"] = line.split('=', 1)[1].strip()
-                            elif 'NumberOfCores=' in line:
-                                cpu_info["physical_cores"] = line.split('=', 1)[1].strip()
-                            elif 'NumberOfLogicalProcessors=' in line:
-                                cpu_info["logical_cores"] = line.split('=', 1)[1].strip()
-                except:
+                    if values.get("ProcessorNameString"):
+                        cpu_info["name"] = values["ProcessorNameString"].strip()
+                except OSError:
                     pass
+                cpu_info["physical_cores"] = str(psutil.cpu_count(logical=False) or "Unknown")
+                cpu_info["logical_cores"] = str(psutil.cpu_count(logical=True) or "Unknown")
 
             return cpu_info
 
@@ -111,32 +191,18 @@ class SystemInfo:
     def _get_cpu_cores(self) -> int:
         """Get number of CPU cores"""
         try:
-            return int(subprocess.run(
-                ['wmic', 'cpu', 'get', 'NumberOfCores', '/format:value'],
-                capture_output=True, text=True
-            ).stdout.strip().split('=')[1])
+            return psutil.cpu_count(logical=False) or psutil.cpu_count() or 1
         except:
-            try:
-                import os
-                return os.cpu_count() or 1
-            except:
-                return 1
+            return 1
 
     def _get_memory_info(self) -> Dict[str, str]:
         """Get memory information"""
         try:
-            if platform.system() == "Windows":
-                result = subprocess.run(
-                    ['wmic', 'computersystem', 'get', 'TotalPhysicalMemory', '/format:value'],
-                    capture_output=True, text=True
-                )
-                if result.returncode == 0:
-                    total_memory = result.stdout.strip().split('=')[1]
-                    return {
-                        "total_physical_memory_bytes": total_memory,
-                        "total_physical_memory_gb": str(round(int(total_memory) / (1024 ** 3), 2))
-                    }
-            return {"total_physical_memory": "Unknown"}
+            total_memory = psutil.virtual_memory().total
+            return {
+                "total_physical_memory_bytes": str(total_memory),
+                "total_physical_memory_gb": str(round(total_memory / (1024 ** 3), 2))
+            }
         except Exception as e:
             return {"error": f"Failed to get memory info: {str(e)}"}
 
@@ -144,36 +210,27 @@ class SystemInfo:
         """Get disk information"""
         try:
             if platform.system() == "Windows":
-                result = subprocess.run(
-                    ['wmic', 'logicaldisk', 'where', 'drivetype=3', 'get', 'DeviceID,Size,FreeSpace', '/format:list'],
-                    capture_output=True, text=True
-                )
-                if result.returncode == 0:
-                    disks = {}
-                    current_disk = {}
-
-                    for line in result.stdout.split('\n'):
-                        line = line.strip()
-                        if line.startswith('DeviceID='):
-                            if current_disk:
-                                disk_id = current_disk.get('DeviceID', 'Unknown')
-                                disks[disk_id] = current_disk.copy()
-                            current_disk = {'DeviceID': line.split('=', 1)[1]}
-                        elif line.startswith('Size='):
-                            size_bytes = line.split('=', 1)[1]
-                            current_disk['SizeBytes'] = size_bytes
-                            current_disk['SizeGB'] = str(round(int(size_bytes) / (1024 ** 3), 2))
-                        elif line.startswith('FreeSpace='):
-                            free_bytes = line.split('=', 1)[1]
-                            current_disk['FreeSpaceBytes'] = free_bytes
-                            current_disk['FreeSpaceGB'] = str(round(int(free_bytes) / (1024 ** 3), 2))
-
-                    # Add the last disk
-                    if current_disk:
-                        disk_id = current_disk.get('DeviceID', 'Unknown')
-                        disks[disk_id] = current_disk
-
-                    return disks
+                disks = {}
+
+                # Only local fixed drives, same as Win32_LogicalDisk DriveType=3
+                for partition in psutil.disk_partitions(all=False):
+                    if 'fixed' not in partition.opts:
+                        continue
+                    try:
+                        usage = psutil.disk_usage(partition.mountpoint)
+                    except OSError:
+                        continue
+
+                    disk_id = partition.device.rstrip('\\')
+                    disks[disk_id] = {
+                        'DeviceID': disk_id,
+                        'SizeBytes': str(usage.total),
+                        'SizeGB': str(round(usage.total / (1024 ** 3), 2)),
+                        'FreeSpaceBytes': str(usage.free),
+                        'FreeSpaceGB': str(round(usage.free / (1024 ** 3), 2))
+                    }
+
+                return disks
 
             return {"info": "Disk information available only on Windows"}
         except Exception as e:
@@ -189,17 +246,11 @@ class SystemInfo:
                 "ip_address": self._get_ip_address()
             }
 
-            # Try to get more network info on Windows
-            if platform.system() == "Windows":
-                try:
-                    result = subprocess.run(
-                        ['ipconfig', '/all'],
-                        capture_output=True, text=True, encoding='utf-8'
-                    )
-                    if result.returncode == 0:
-                        network_info["detailed"] = self._parse_ipconfig(result.stdout)
-                except:
-                    pass
+            # Per-interface addresses and link state
+            try:
+                network_info["detailed"] = self._get_interfaces_info()
+            except Exception as e:
+                network_info["detailed"] = {"error": f"Failed to get interfaces: {str(e)}"}
 
             return network_info
 
@@ -208,77 +259,85 @@ class SystemInfo:
 
     def _get_mac_address(self) -> str:
         """Get MAC address"""
+        if self._mac_address is not None:
+            return self._mac_address
         try:
             mac = uuid.getnode()
-            return ':'.join(("%012X" % mac)[i:i + 2] for i in range(0, 12, 2))
+            self._mac_address = "{:02X}:{:02X}:{:02X}:{:02X}:{:02X}:{:02X}".format(*mac.to_bytes(6, 'big'))
+            return self._mac_address
         except:
             return "Unknown"
 
     def _get_ip_address(self) -> str:
         """Get IP address"""
+        if self._ip_address is not None and self._ip_address[1] > time.monotonic():
+            return self._ip_address[0]
         try:
             # Get local IP address
             s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             s.connect(("8.8.8.8", 80))
             ip_address = s.getsockname()[0]
             s.close()
+            self._ip_address = (ip_address, time.monotonic() + self.IP_ADDRESS_TTL)
             return ip_address
         except:
             return "Unknown"
 
-    def _parse_ipconfig(self, ipconfig_output: str) -> Dict[str, Any]:
-        """Parse ipconfig /all output"""
-        try:
-            interfaces = {}
-            current_interface = None
-
-            for line in ipconfig_output.split('\n'):
-                line = line.strip()
-
-                # New interface section
-                if line and not line.startswith(' ') and line.endswith(':'):
-                    if current_interface:
-                        interfaces[current_interface['name']] = current_interface
-                    current_interface = {'name': line.rstrip(':'), 'properties': {}}
-
-                # Interface properties
-                elif current_interface and ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip()
-                    value = value.strip()
-
-                    if key and value:
-                        current_interface['properties'][key] = value
-
-            # Add the last interface
-            if current_interface:
-                interfaces[current_interface['name']] = current_interface
+    def _get_interfaces_info(self) -> Dict[str, Any]:
+        """Get addresses and status of each network interface"""
+        stats = psutil.net_if_stats()
+        interfaces = {}
+
+        for name, addresses in psutil.net_if_addrs().items():
+            interface_stats = stats.get(name)
+            interfaces[name] = {
+                "addresses": [
+                    {
+                        "family": getattr(address.family, "name", str(address.family)),
+                        "address": address.address,
+                        "netmask": address.netmask,
+                        "broadcast": address.broadcast
+                    }
+                    for address in addresses
+                ],
+                "stats": {
+                    "is_up": interface_stats.isup,
+                    "speed_mbps": interface_stats.speed,
+                    "mtu": interface_stats.mtu
+                } if interface_stats else None
+            }
 
-            return interfaces
-
-        except Exception as e:
-            return {"error": f"Failed to parse ipconfig: {str(e)}"}
+        return interfaces
 
     def _get_bios_info(self) -> Dict[str, str]:
         """Get BIOS information"""
         try:
             if platform.system() == "Windows":
-                result = subprocess.run(
-                    ['wmic', 'bios', 'get', 'SerialNumber,Version,Manufacturer', '/format:list'],
-                    capture_output=True, text=True
-                )
-                if result.returncode == 0:
-                    bios_info = {}
-                    for line in result.stdout.split('\n'):
-                        line = line.strip()
-                        if 'SerialNumber=' in line:
-                            bios_info["serial_number"] = line.split('=', 1)[1]
-                        elif 'Version=' in line:
-                            bios_info["version"] = line.split('=', 1)[1]
-                        elif 'Manufacturer=' in line:
-                            bios_info["manufacturer"] = line.split('=', 1)[1]
-
-                    return bios_info
+                bios_info = {}
+
+                # The serial number is not stored in the registry; wmic is
+                # missing on newer Windows builds, keep the registry values then
+                try:
+                    output = self._run_command(['wmic', 'bios', 'get', 'SerialNumber', '/format:list'])
+                except OSError:
+                    output = None
+                if output is not None:
+                    values = dict(_WMIC_KV_RE.findall(output))
+                    if 'SerialNumber' in values:
+                        bios_info["serial_number"] = values['SerialNumber'].strip()
+
+                try:
+                    values = self._read_registry_values(
+                        r"HARDWARE\DESCRIPTION\System\BIOS", ["BIOSVersion", "BIOSVendor"]
+                    )
+                except OSError:
+                    values = {}
+                if "BIOSVersion" in values:
+                    bios_info["version"] = values["BIOSVersion"]
+                if "BIOSVendor" in values:
+                    bios_info["manufacturer"] = values["BIOSVendor"]
+
+                return bios_info
 
             return {"info": "BIOS information available only on Windows"}
         except Exception as e:
@@ -296,6 +355,9 @@ class SystemInfo:
         Returns:
             str: Unique identifier based on system properties
         """
+        if self._unique_id is not None:
+            return self._unique_id
+
         try:
             # Combine multiple system properties for uniqueness
             system_info = self.collect_all_info()
@@ -319,7 +381,8 @@ class SystemInfo:
             # Create a unique hash
             import hashlib
             identifier_string = "-".join(identifiers)
-            return hashlib.sha256(identifier_string.encode()).hexdigest()[:32]
+            self._unique_id = hashlib.sha256(identifier_string.encode()).hexdigest()[:32]
+            return self._unique_id
 
         except Exception as e:
             return f"unknown_system_{hash(str(e))}"
@@ -336,6 +399,8 @@ class SystemInfo:
     def clear_cache(self) -> None:
         """Clear cached system information"""
         self._cached_info = None
+        self._unique_id = None
+        self._ip_address = None
 
     def refresh(self) -> Dict[str, Any]:
         """
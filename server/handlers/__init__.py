@@ -1 +1 @@
-from .agent import agent_data_handler
+from .agent import agent_data_handler, INGEST_QUEUE, SERVER_CLOCK, CoarseClock
@@ -1,12 +1,37 @@
 # handlers.py
 from aiohttp import web
+import asyncio
 import json
 from datetime import datetime
 import logging
 
+from .serialization import loads, json_response
+
 # Get logger
 logger = logging.getLogger("AgentHandler")
 
+# (hostname, data) reports waiting to be stored in batches by the server
+INGEST_QUEUE = web.AppKey("ingest_queue", asyncio.Queue)
+
+
+class CoarseClock:
+    """
+    Current time as an ISO 8601 string with second precision
+
+    The server refreshes it from a background task so request handlers
+    read a ready-made string instead of formatting the time themselves.
+    """
+
+    def __init__(self):
+        self.now_iso = None
+
+    def tick(self):
+        """Refresh the current time string"""
+        self.now_iso = datetime.now().isoformat(timespec='seconds')
+
+
+SERVER_CLOCK = web.AppKey("server_clock", CoarseClock)
+
 
 async def agent_data_handler(request):
     """
@@ -17,10 +42,11 @@ async def agent_data_handler(request):
         # Get the main app instance
         # Parse JSON data
         try:
-            data = await request.json()
+            # aiohttp has already undone Content-Encoding (gzip/zstd) here
+            data = loads(await request.read())
         except json.JSONDecodeError:
             logger.error("Invalid JSON received")
-            return web.json_response(
+            return json_response(
                 {"error": "Invalid JSON data"},
                 status=400
             )
@@ -28,15 +54,26 @@ async def agent_data_handler(request):
         hostname = data.get('system_info', {}).get('system', {}).get('hostname', 'Unknown')
         logger.info(f"Received agent data from: {hostname}")
 
-        return web.json_response({
+        # Storage happens in batches on the server's flush worker
+        ingest_queue = request.app.get(INGEST_QUEUE)
+        if ingest_queue is not None:
+            ingest_queue.put_nowait((hostname, data))
+
+        clock = request.app.get(SERVER_CLOCK)
+        if clock is not None and clock.now_iso is not None:
+            received_timestamp = clock.now_iso
+        else:
+            received_timestamp = datetime.now().replace(microsecond=0)
+
+        return json_response({
             "status": "success",
             "message": "Agent data received successfully",
-            "received_timestamp": datetime.now().isoformat(),
+            "received_timestamp": received_timestamp,
         })
 
     except Exception as e:
         logger.error(f"Error processing agent data: {str(e)}")
-        return web.json_response(
+        return json_response(
             {"error": "Internal server error"},
             status=500
         )
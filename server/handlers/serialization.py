@@ -0,0 +1,35 @@
+# serialization.py
+from aiohttp import web
+from datetime import datetime
+import json
+
+try:
+    import orjson
+
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:
+    def _default(obj):
+        # orjson encodes datetime natively, match its ISO 8601 output
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, default=_default).encode('utf-8')
+
+    loads = json.loads
+
+
+def json_response(data, status: int = 200) -> web.Response:
+    """
+    Build a JSON response encoded with orjson when available
+
+    Args:
+        data: JSON-serializable response data
+        status: HTTP status code
+
+    Returns:
+        web.Response: Response with application/json body
+    """
+    return web.Response(body=dumps(data), status=status, content_type='application/json')
@@ -1,8 +1,16 @@
 # app.py
 from aiohttp import web
+import asyncio
 import logging
-from handlers.agent import agent_data_handler
-import json
+import multiprocessing
+import socket
+try:
+    from .handlers.agent import agent_data_handler, INGEST_QUEUE, SERVER_CLOCK, CoarseClock
+    from .handlers.serialization import json_response
+except ImportError:
+    # Run as a script from the server directory
+    from handlers.agent import agent_data_handler, INGEST_QUEUE, SERVER_CLOCK, CoarseClock
+    from handlers.serialization import json_response
 
 
 class ServerApp:
@@ -10,13 +18,31 @@ class ServerApp:
     Main server application using aiohttp
     """
 
-    def __init__(self, host: str = '0.0.0.0', port: int = 8000):
+    # Agent reports are stored once this many arrive or the interval passes
+    INGEST_BATCH_SIZE = 64
+    INGEST_FLUSH_INTERVAL = 0.05
+
+    # How often the shared time string for responses is refreshed, in seconds
+    CLOCK_TICK_INTERVAL = 0.5
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 8000, workers: int = 1):
         self.host = host
         self.port = port
+        # Worker processes sharing the port; each keeps its own received data
+        self.workers = workers
         self.app = web.Application()
-        self.received_data = []
+        # Latest report per agent hostname
+        self.received_data = {}
+        self.app[INGEST_QUEUE] = asyncio.Queue()
+        self._flush_task = None
+        self.app[SERVER_CLOCK] = CoarseClock()
+        self._clock_task = None
         self.setup_logging()
         self.setup_routes()
+        self.app.on_startup.append(self._start_flush_worker)
+        self.app.on_startup.append(self._start_clock)
+        self.app.on_cleanup.append(self._stop_flush_worker)
+        self.app.on_cleanup.append(self._stop_clock)
 
     def setup_logging(self):
         """Setup logging configuration"""
@@ -34,16 +60,97 @@ class ServerApp:
         self.app.router.add_get('/health', self.health_handler)
         self.app.router.add_get('/', self.root_handler)
 
+    async def _start_clock(self, app):
+        """Start refreshing the shared time string"""
+        clock = self.app[SERVER_CLOCK]
+        clock.tick()
+        self._clock_task = asyncio.create_task(self._clock_loop(clock))
+
+    async def _stop_clock(self, app):
+        """Stop refreshing the shared time string"""
+        if self._clock_task is not None:
+            self._clock_task.cancel()
+            try:
+                await self._clock_task
+            except asyncio.CancelledError:
+                pass
+            self._clock_task = None
+
+    async def _clock_loop(self, clock: CoarseClock):
+        """Refresh the shared time string until cancelled"""
+        while True:
+            await asyncio.sleep(self.CLOCK_TICK_INTERVAL)
+            clock.tick()
+
+    async def _start_flush_worker(self, app):
+        """Start storing queued agent reports"""
+        self._flush_task = asyncio.create_task(self._flush_worker())
+
+    async def _stop_flush_worker(self, app):
+        """Stop the flush worker and store what is still queued"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        ingest_queue = self.app[INGEST_QUEUE]
+        batch = []
+        while not ingest_queue.empty():
+            batch.append(ingest_queue.get_nowait())
+        if batch:
+            self._store_batch(batch)
+
+    async def _flush_worker(self):
+        """Collect queued agent reports and store them in batches"""
+        ingest_queue = self.app[INGEST_QUEUE]
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await ingest_queue.get()]
+            deadline = loop.time() + self.INGEST_FLUSH_INTERVAL
+
+            try:
+                while len(batch) < self.INGEST_BATCH_SIZE:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(ingest_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Stopped while collecting, the reports are already off the queue
+                self._store_batch(batch)
+                raise
+
+            try:
+                self._store_batch(batch)
+            except Exception as e:
+                self.logger.error(f"Failed to store {len(batch)} agent reports: {e}")
+
+    def _store_batch(self, batch):
+        """
+        Store a batch of agent reports, replacing each host's previous report
+
+        Args:
+            batch: list of (hostname, data) tuples
+        """
+        self.received_data.update(batch)
+        self.logger.info(f"Stored {len(batch)} agent reports")
+
     async def health_handler(self, request):
         """Health check endpoint"""
-        return web.json_response({
+        return json_response({
             "status": "healthy",
             "received_reports": len(self.received_data)
         })
 
     async def root_handler(self, request):
         """Root endpoint"""
-        return web.json_response({
+        return json_response({
             "message": "System Inventory Server is running",
             "endpoint": "POST /api/v1/agent/data"
         })
@@ -57,12 +164,53 @@ class ServerApp:
             f"📨 Agent data endpoint: POST http://{self.host if self.host != '0.0.0.0' else 'localhost'}:{self.port}/api/v1/agent/data")
         print("Press Ctrl+C to stop the server\n")
 
-        web.run_app(
-            self.app,
-            host=self.host,
-            port=self.port,
-            print=None  # Disable aiohttp default logging
-        )
+        # Without SO_REUSEPORT the workers cannot share the port
+        workers = self.workers if hasattr(socket, 'SO_REUSEPORT') else 1
+        if workers == 1:
+            try:
+                asyncio.run(self.serve())
+            except KeyboardInterrupt:
+                pass
+            return
+
+        self.logger.info(f"Starting {workers} worker processes")
+        processes = [
+            multiprocessing.Process(target=_run_worker, args=(self.host, self.port))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
+
+    async def serve(self, reuse_port: bool = False):
+        """
+        Serve the application until cancelled
+
+        Args:
+            reuse_port: Bind with SO_REUSEPORT so several processes share the port
+        """
+        # No access log, it is formatted on every request
+        runner = web.AppRunner(self.app, access_log=None)
+        await runner.setup()
+        try:
+            site = web.TCPSite(runner, self.host, self.port, reuse_port=reuse_port)
+            await site.start()
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+def _run_worker(host: str, port: int):
+    """Run one server worker process listening with SO_REUSEPORT"""
+    try:
+        asyncio.run(ServerApp(host, port, workers=1).serve(reuse_port=True))
+    except KeyboardInterrupt:
+        pass
 
 
 # Create global app instance
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# pytest-xdist runs the suite in worker processes gw0, gw1, ... (see pytest.ini)
+XDIST_WORKER = os.environ.get('PYTEST_XDIST_WORKER', 'main')
+
+
+@pytest.fixture
+def config_file(tmp_path_factory):
+    """Path of a not yet existing config file, unique per test and xdist worker"""
+    return str(tmp_path_factory.mktemp("config") / f"config_{XDIST_WORKER}.json")
+
+
+if uvloop is not None and sys.platform != 'win32':
+    def pytest_asyncio_loop_factories(config, item):
+        """Run the aiohttp tests on uvloop instead of the default selector loop"""
+        return {'uvloop': uvloop.new_event_loop}
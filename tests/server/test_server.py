@@ -1,192 +1,348 @@
+import asyncio
+import gzip
 import json
 import unittest
-from unittest.mock import patch, MagicMock
-from aiohttp import web
-from aiohttp.test_utils import AioHTTPTestCase, unittest_run_loop
-from datetime import datetime
-
-from server.handlers import agent_data_handler
-
-
-class TestAgentDataHandler(AioHTTPTestCase):
-    """Тесты для хендлера agent_data_handler"""
-
-    async def get_application(self):
-        """Создаем aiohttp приложение для тестов"""
-        app = web.Application()
-        app.router.add_post('/api/v1/agent/data', agent_data_handler)
-        return app
-
-    @unittest_run_loop
-    async def test_successful_agent_data_processing(self):
-        """Тест успешной обработки корректных данных агента"""
-        # Подготовка тестовых данных
-        test_data = {
-            "scan_timestamp": datetime.now().isoformat(),
-            "system_info": {
-                "system": {
-                    "platform": "Windows",
-                    "platform_release": "10",
-                    "platform_version": "10.0.19041",
-                    "architecture": "64bit",
-                    "hostname": "TEST-PC-01",
-                    "processor": "Intel64 Family 6 Model 158 Stepping 10",
-                    "python_version": "3.8.5"
-                },
-                "hardware": {
-                    "cpu": {
-                        "processor": "Intel64 Family 6 Model 158 Stepping 10",
-                        "cores": "8",
-                        "architecture": "AMD64"
-                    },
-                    "memory": {
-                        "total_physical_memory_bytes": "17179869184",
-                        "total_physical_memory_gb": "16.0"
-                    }
-                },
-                "network": {
-                    "hostname": "TEST-PC-01",
-                    "fqdn": "TEST-PC-01.local",
-                    "mac_address": "00:1B:44:11:3A:B7",
-                    "ip_address": "192.168.1.100"
-                },
-                "bios": {
-                    "serial_number": "S/N-1234567890",
-                    "version": "F.60",
-                    "manufacturer": "American Megatrends Inc."
-                }
+from unittest.mock import patch, AsyncMock
+
+import pytest
+import pytest_asyncio
+from aiohttp import TCPConnector, web
+from aiohttp.test_utils import TestClient, TestServer, make_mocked_request
+
+from server.handlers import agent_data_handler, INGEST_QUEUE, SERVER_CLOCK, CoarseClock
+from server.handlers.serialization import dumps, loads
+from server.server import ServerApp
+
+
+# Tests never look at the scan time, a fixed one keeps payloads deterministic
+_FIXED_TS = "2024-01-01T00:00:00"
+
+# Payloads are built once at import; tests must not modify them
+_SAMPLE_PAYLOAD = {
+    "scan_timestamp": _FIXED_TS,
+    "system_info": {
+        "system": {
+            "platform": "Windows",
+            "platform_release": "10",
+            "platform_version": "10.0.19041",
+            "architecture": "64bit",
+            "hostname": "TEST-PC-01",
+            "processor": "Intel64 Family 6 Model 158 Stepping 10",
+            "python_version": "3.8.5"
+        },
+        "hardware": {
+            "cpu": {
+                "processor": "Intel64 Family 6 Model 158 Stepping 10",
+                "cores": "8",
+                "architecture": "AMD64"
             },
-            "software_count": 2,
-            "software_list": [
-                {
-                    "name": "Google Chrome",
-                    "version": "91.0.4472.124",
-                    "vendor": "Google LLC",
-                    "install_date": "2023-01-15",
-                    "source": "registry"
-                },
-                {
-                    "name": "Python 3.8.5",
-                    "version": "3.8.5150.0",
-                    "vendor": "Python Software Foundation",
-                    "install_date": "2023-03-10",
-                    "source": "registry"
-                }
-            ]
+            "memory": {
+                "total_physical_memory_bytes": "17179869184",
+                "total_physical_memory_gb": "16.0"
+            }
+        },
+        "network": {
+            "hostname": "TEST-PC-01",
+            "fqdn": "TEST-PC-01.local",
+            "mac_address": "00:1B:44:11:3A:B7",
+            "ip_address": "192.168.1.100"
+        },
+        "bios": {
+            "serial_number": "S/N-1234567890",
+            "version": "F.60",
+            "manufacturer": "American Megatrends Inc."
         }
-
-        # Отправка POST запроса
-        resp = await self.client.post('/api/v1/agent/data', json=test_data)
-
-        # Проверки
-        self.assertEqual(resp.status, 200)
-
-        data = await resp.json()
-        self.assertEqual(data['status'], 'success')
-        self.assertEqual(data['message'], 'Agent data received successfully')
-        self.assertIn('received_timestamp', data)
-
-    @unittest_run_loop
-    async def test_invalid_json_data(self):
-        """Тест обработки невалидного JSON"""
-        # Отправка невалидного JSON
-        resp = await self.client.post('/api/v1/agent/data',
-                                      data='invalid json',
-                                      headers={'Content-Type': 'application/json'})
-
-        # Проверки
-        self.assertEqual(resp.status, 400)
-
-        data = await resp.json()
-        self.assertEqual(data['error'], 'Invalid JSON data')
-
-    @unittest_run_loop
-    async def test_missing_hostname_in_data(self):
-        """Тест обработки данных без hostname"""
-        test_data = {
-            "scan_timestamp": datetime.now().isoformat(),
-            "system_info": {
-                "system": {
-                    # Отсутствует hostname
-                    "platform": "Windows",
-                    "platform_release": "10"
-                }
-            },
-            "software_count": 0,
-            "software_list": []
+    },
+    "software_count": 2,
+    "software_list": [
+        {
+            "name": "Google Chrome",
+            "version": "91.0.4472.124",
+            "vendor": "Google LLC",
+            "install_date": "2023-01-15",
+            "source": "registry"
+        },
+        {
+            "name": "Python 3.8.5",
+            "version": "3.8.5150.0",
+            "vendor": "Python Software Foundation",
+            "install_date": "2023-03-10",
+            "source": "registry"
         }
+    ]
+}
 
-        resp = await self.client.post('/api/v1/agent/data', json=test_data)
 
-        # Должен вернуться успешный ответ, даже если hostname отсутствует
-        self.assertEqual(resp.status, 200)
+_NO_HOSTNAME_PAYLOAD = {
+    "scan_timestamp": _FIXED_TS,
+    "system_info": {
+        "system": {
+            # Отсутствует hostname
+            "platform": "Windows",
+            "platform_release": "10"
+        }
+    },
+    "software_count": 0,
+    "software_list": []
+}
+
+
+_EMPTY_SOFTWARE_PAYLOAD = {
+    "scan_timestamp": _FIXED_TS,
+    "system_info": {
+        "system": {
+            "platform": "Windows",
+            "hostname": "TEST-PC-01"
+        }
+    },
+    "software_count": 0,
+    "software_list": []
+}
 
-        data = await resp.json()
-        self.assertEqual(data['status'], 'success')
 
-    @unittest_run_loop
-    async def test_empty_software_list(self):
-        """Тест обработки данных с пустым списком ПО"""
-        test_data = {
-            "scan_timestamp": datetime.now().isoformat(),
-            "system_info": {
-                "system": {
-                    "platform": "Windows",
-                    "hostname": "TEST-PC-01"
-                }
-            },
-            "software_count": 0,
-            "software_list": []
+_MINIMAL_PAYLOAD = {
+    "scan_timestamp": _FIXED_TS,
+    "system_info": {
+        "system": {
+            "hostname": "MINIMAL-PC"
         }
+    },
+    "software_count": 0,
+    "software_list": []
+}
 
-        resp = await self.client.post('/api/v1/agent/data', json=test_data)
 
-        self.assertEqual(resp.status, 200)
+# Payloads encoded once and posted as raw bytes
+_SAMPLE_BYTES = dumps(_SAMPLE_PAYLOAD)
+_NO_HOSTNAME_BYTES = dumps(_NO_HOSTNAME_PAYLOAD)
+_EMPTY_SOFTWARE_BYTES = dumps(_EMPTY_SOFTWARE_PAYLOAD)
+_MINIMAL_BYTES = dumps(_MINIMAL_PAYLOAD)
+_JSON_HDR = {'Content-Type': 'application/json'}
 
-        data = await resp.json()
-        self.assertEqual(data['status'], 'success')
 
-    @unittest_run_loop
-    async def test_minimal_valid_data(self):
-        """Тест обработки минимально валидных данных"""
-        test_data = {
-            "scan_timestamp": datetime.now().isoformat(),
-            "system_info": {
-                "system": {
-                    "hostname": "MINIMAL-PC"
-                }
-            },
-            "software_count": 0,
-            "software_list": []
-        }
+# Tests on the shared client run in the session event loop it was created in
+session_loop = pytest.mark.asyncio(loop_scope="session")
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def client():
+    """Создаем одно aiohttp приложение на всю сессию тестов"""
+    app = web.Application()
+    app.router.add_post('/api/v1/agent/data', agent_data_handler)
+    # Одно keep-alive соединение на все тесты сессии
+    connector = TCPConnector(limit=1, force_close=False, keepalive_timeout=300)
+    async with TestClient(TestServer(app), connector=connector) as test_client:
+        yield test_client
+
+
+@session_loop
+async def test_successful_agent_data_processing(client):
+    """Тест успешной обработки корректных данных агента"""
+    # Отправка POST запроса
+    resp = await client.post('/api/v1/agent/data', data=_SAMPLE_BYTES, headers=_JSON_HDR)
+
+    # Проверки
+    assert resp.status == 200
+
+    data = loads(await resp.read())
+    assert data['status'] == 'success'
+    assert data['message'] == 'Agent data received successfully'
+    assert 'received_timestamp' in data
+
+
+@session_loop
+async def test_invalid_json_data(client):
+    """Тест обработки невалидного JSON"""
+    # Отправка невалидного JSON
+    resp = await client.post('/api/v1/agent/data', data='invalid json', headers=_JSON_HDR)
+
+    # Проверки
+    assert resp.status == 400
+
+    data = loads(await resp.read())
+    assert data['error'] == 'Invalid JSON data'
+
+
+@session_loop
+async def test_missing_hostname_in_data(client):
+    """Тест обработки данных без hostname"""
+    resp = await client.post('/api/v1/agent/data', data=_NO_HOSTNAME_BYTES, headers=_JSON_HDR)
+
+    # Должен вернуться успешный ответ, даже если hostname отсутствует
+    assert resp.status == 200
+
+    data = loads(await resp.read())
+    assert data['status'] == 'success'
+
+
+@session_loop
+async def test_empty_software_list(client):
+    """Тест обработки данных с пустым списком ПО"""
+    resp = await client.post('/api/v1/agent/data', data=_EMPTY_SOFTWARE_BYTES, headers=_JSON_HDR)
+
+    assert resp.status == 200
+
+    data = loads(await resp.read())
+    assert data['status'] == 'success'
+
+
+@session_loop
+async def test_minimal_valid_data(client):
+    """Тест обработки минимально валидных данных"""
+    resp = await client.post('/api/v1/agent/data', data=_MINIMAL_BYTES, headers=_JSON_HDR)
+
+    assert resp.status == 200
+
+    data = loads(await resp.read())
+    assert data['status'] == 'success'
+
+
+@session_loop
+async def test_gzip_compressed_data(client):
+    """Тест обработки сжатых gzip данных"""
+    resp = await client.post('/api/v1/agent/data',
+                             data=gzip.compress(_MINIMAL_BYTES),
+                             headers={'Content-Type': 'application/json',
+                                      'Content-Encoding': 'gzip'})
 
-        resp = await self.client.post('/api/v1/agent/data', json=test_data)
+    assert resp.status == 200
 
-        self.assertEqual(resp.status, 200)
+    data = loads(await resp.read())
+    assert data['status'] == 'success'
 
-        data = await resp.json()
-        self.assertEqual(data['status'], 'success')
 
-    @unittest_run_loop
-    async def test_wrong_http_method(self):
-        """Тест вызова хендлера неправильным HTTP методом"""
-        resp = await self.client.get('/api/v1/agent/data')
-        self.assertEqual(resp.status, 405)  # Method Not Allowed
+@session_loop
+async def test_zstd_compressed_data(client):
+    """Тест обработки сжатых zstd данных, так отправляет агент с zstandard"""
+    zstandard = pytest.importorskip("zstandard")
+    resp = await client.post('/api/v1/agent/data',
+                             data=zstandard.ZstdCompressor(level=3).compress(_MINIMAL_BYTES),
+                             headers={'Content-Type': 'application/json',
+                                      'Content-Encoding': 'zstd'})
 
+    assert resp.status == 200
 
-class TestAgentDataHandlerWithMocks(unittest.TestCase):
+    data = loads(await resp.read())
+    assert data['status'] == 'success'
+
+
+@pytest.mark.smoke
+@session_loop
+async def test_wrong_http_method(client):
+    """Тест вызова хендлера неправильным HTTP методом"""
+    resp = await client.get('/api/v1/agent/data')
+    assert resp.status == 405  # Method Not Allowed
+
+
+@pytest.fixture
+async def queue_client(aiohttp_client):
+    """Приложение с очередью на сохранение данных агентов"""
+    app = web.Application()
+    app[INGEST_QUEUE] = asyncio.Queue()
+    app.router.add_post('/api/v1/agent/data', agent_data_handler)
+    return await aiohttp_client(app)
+
+
+async def test_data_is_queued_for_storage(queue_client):
+    """Тест: принятые данные попадают в очередь вместе с hostname"""
+    resp = await queue_client.post('/api/v1/agent/data', data=_MINIMAL_BYTES, headers=_JSON_HDR)
+    assert resp.status == 200
+
+    ingest_queue = queue_client.app[INGEST_QUEUE]
+    assert ingest_queue.qsize() == 1
+    hostname, data = ingest_queue.get_nowait()
+    assert hostname == "MINIMAL-PC"
+    assert data == _MINIMAL_PAYLOAD
+
+
+async def test_invalid_json_is_not_queued(queue_client):
+    """Тест: невалидный JSON не попадает в очередь"""
+    resp = await queue_client.post('/api/v1/agent/data', data='invalid json', headers=_JSON_HDR)
+    assert resp.status == 400
+    assert queue_client.app[INGEST_QUEUE].empty()
+
+
+@pytest.fixture
+async def clock_client(aiohttp_client):
+    """Приложение с часами сервера, показывающими фиксированное время"""
+    app = web.Application()
+    clock = CoarseClock()
+    clock.now_iso = "2024-01-01T12:00:00"
+    app[SERVER_CLOCK] = clock
+    app.router.add_post('/api/v1/agent/data', agent_data_handler)
+    return await aiohttp_client(app)
+
+
+async def test_received_timestamp_from_clock(clock_client):
+    """Тест: received_timestamp берется из часов сервера"""
+    resp = await clock_client.post('/api/v1/agent/data', data=b'{"software_list": []}', headers=_JSON_HDR)
+    assert resp.status == 200
+
+    data = loads(await resp.read())
+    assert data['received_timestamp'] == "2024-01-01T12:00:00"
+
+
+@pytest.fixture
+async def server_app(aiohttp_client):
+    """Полное приложение сервера с фоновыми задачами on_startup/on_cleanup"""
+    server_app = ServerApp()
+    client = await aiohttp_client(server_app.app)
+    return server_app, client
+
+
+async def test_latest_report_per_host_is_stored(server_app):
+    """Тест: для одного hostname хранится только последний отчет"""
+    server_app, client = server_app
+    updated = dict(_SAMPLE_PAYLOAD, software_count=0, software_list=[])
+
+    for payload in (_SAMPLE_PAYLOAD, updated):
+        resp = await client.post('/api/v1/agent/data', data=dumps(payload), headers=_JSON_HDR)
+        assert resp.status == 200
+
+    # Ждем, пока flush worker сохранит второй отчет
+    for _ in range(100):
+        if server_app.received_data.get("TEST-PC-01") == updated:
+            break
+        await asyncio.sleep(0.01)
+
+    assert server_app.received_data == {"TEST-PC-01": updated}
+
+    resp = await client.get('/health')
+    assert loads(await resp.read())['received_reports'] == 1
+
+
+async def test_cleanup_stores_pending_reports(server_app):
+    """Тест: при остановке сервера отчеты из очереди не теряются"""
+    server_app, client = server_app
+    # Пачка не успеет сохраниться сама до остановки
+    server_app.INGEST_FLUSH_INTERVAL = 60
+
+    resp = await client.post('/api/v1/agent/data', data=_MINIMAL_BYTES, headers=_JSON_HDR)
+    assert resp.status == 200
+    assert server_app.received_data == {}
+
+    await client.close()
+
+    assert server_app.received_data == {"MINIMAL-PC": _MINIMAL_PAYLOAD}
+
+
+class TestAgentDataHandlerWithMocks(unittest.IsolatedAsyncioTestCase):
     """Тесты с моками для проверки ошибок"""
 
     def setUp(self):
         self.app = web.Application()
-        self.app.router.add_post('/api/v1/agent/data', agent_data_handler)
 
-    @patch('your_module.logger')
+    def make_request(self, **read_kwargs):
+        """Создаем настоящий aiohttp request, подменяя только чтение тела"""
+        request = make_mocked_request('POST', '/api/v1/agent/data', app=self.app)
+        request.read = AsyncMock(**read_kwargs)
+        return request
+
+    @patch('server.handlers.agent.logger')
     async def test_exception_handling(self, mock_logger):
         """Тест обработки внутренних исключений"""
-        # Создаем mock request, который вызовет исключение
-        mock_request = MagicMock()
-        mock_request.json.side_effect = Exception("Test exception")
+        # Создаем request, который вызовет исключение
+        mock_request = self.make_request(side_effect=Exception("Test exception"))
 
         # Вызываем хендлер напрямую
         response = await agent_data_handler(mock_request)
@@ -198,14 +354,13 @@ class TestAgentDataHandlerWithMocks(unittest.TestCase):
         self.assertEqual(response.status, 500)
 
         # Получаем тело ответа
-        response_data = json.loads(response.text)
+        response_data = loads(response.body)
         self.assertEqual(response_data['error'], 'Internal server error')
 
-    @patch('your_module.logger')
+    @patch('server.handlers.agent.logger')
     async def test_json_decode_error(self, mock_logger):
         """Тест обработки ошибки декодирования JSON"""
-        mock_request = MagicMock()
-        mock_request.json.side_effect = json.JSONDecodeError("Invalid JSON", "doc", 0)
+        mock_request = self.make_request(side_effect=json.JSONDecodeError("Invalid JSON", "doc", 0))
 
         response = await agent_data_handler(mock_request)
 
@@ -215,5 +370,5 @@ class TestAgentDataHandlerWithMocks(unittest.TestCase):
         # Проверяем ответ
         self.assertEqual(response.status, 400)
 
-        response_data = json.loads(response.text)
+        response_data = loads(response.body)
         self.assertEqual(response_data['error'], 'Invalid JSON data')